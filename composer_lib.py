@@ -0,0 +1,389 @@
+# Shared fetch, merge, and output logic for the symphony group scripts.
+# Each group script (e.g. 530symphs.py) only defines its SYMPHONIES and hands
+# them to run_main_logic, so every group uses the same code path.
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import os
+from datetime import datetime, date
+import json
+import time
+import sys
+import hashlib
+import tempfile
+import importlib.util
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# orjson is optional. When it is installed, the (large) backtest responses are
+# parsed and cached with it, which is several times faster than the standard
+# json module and works on bytes directly, skipping a str decode/encode step.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# --- API Endpoints ---
+BACKTEST_API_BASE = "https://backtest-api.composer.trade/api/v2"
+LIVE_API_BASE = "https://stagehand-api.composer.trade/api/v1"
+
+# --- Backtest Settings ---
+# Every backtest request uses these settings; only the start and end dates vary.
+BACKTEST_PAYLOAD = {
+    "capital": 10000, "broker": "apex", "slippage_percent": 0.0005,
+    "backtest_version": "v2", "apply_reg_fee": True, "apply_taf_fee": True
+}
+
+# --- HTTP Session ---
+# One shared session keeps the connections to both API hosts alive between
+# calls, so only the first request to each host pays for the TCP/TLS handshake.
+# The auth headers are set on it once per run by set_auth_headers. Responses come back
+# compressed: requests always offers gzip/deflate and also offers Brotli ("br"),
+# which shrinks the JSON further, whenever the optional brotli package is installed.
+#
+# Connection errors, rate limiting (429) and server errors (5xx) are retried
+# with exponential backoff, so a single hiccup no longer drops a symphony from
+# the output. Both endpoints only read data, so retrying the POST is safe too.
+RETRY_POLICY = Retry(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET", "POST"],
+)
+
+# Maximum number of API requests in flight at once. Keeping the pool small
+# stays polite to the API now that the symphonies are fetched concurrently.
+MAX_WORKERS = 8
+
+# Each host's connection pool keeps up to MAX_WORKERS connections alive, one per
+# worker thread, so concurrent requests never have to open (and then throw
+# away) an extra connection because the pool was full.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS, max_retries=RETRY_POLICY))
+
+# --- Response Cache ---
+# API responses are saved under ~/.cache/composer so that re-running a script,
+# running another group that shares symphonies, or running zscore.py afterwards
+# skips the request entirely. A backtest is only reused on the day it was
+# fetched (its cache key includes the end date); live data goes stale much faster.
+# Pass --no-cache on the command line, or set COMPOSER_CACHE_DISABLE=1, to
+# always fetch fresh data.
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "composer")
+BACKTEST_CACHE_SECONDS = 12 * 60 * 60
+LIVE_CACHE_SECONDS = 5 * 60
+USE_CACHE = "--no-cache" not in sys.argv and os.environ.get("COMPOSER_CACHE_DISABLE") != "1"
+
+
+@functools.lru_cache(maxsize=1)
+def get_auth_details():
+    """
+    Returns (api_key, secret_key, account_id) from auth.py. The result is kept for
+    the rest of the process, so however many runners or scripts ask for the
+    credentials during one run, auth.py's login flow only runs once.
+    """
+    from auth import get_auth_details as load_auth_details
+    return load_auth_details()
+
+def load_script_module(script_file):
+    """
+    Imports one of the repo's scripts from its file path and returns the module
+    without running its __main__ block. Used for the symphony group scripts
+    (e.g. 530symphs.py), whose SYMPHONIES and START_DATE are read in-process,
+    and by zscore.py for master_runner.py's SYMPHONY_SCRIPT_FILES. Modules are
+    cached in sys.modules under their absolute path, so loading the same
+    script again is free.
+    """
+    cache_key = os.path.abspath(script_file)
+    if cache_key in sys.modules:
+        return sys.modules[cache_key]
+    module_name = os.path.splitext(os.path.basename(script_file))[0]
+    spec = importlib.util.spec_from_file_location(module_name, script_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[cache_key] = module
+    return module
+
+def set_auth_headers(api_key, secret_key):
+    """Attaches the Composer API credentials to every request made through SESSION."""
+    SESSION.headers.update({
+        "Authorization": f"Bearer {secret_key}",
+        "x-api-key-id": api_key,
+        "x-origin": "public-api"
+    })
+
+def parse_json(raw):
+    """Parses a JSON document from bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def cache_path(kind, key):
+    """Returns the cache file for a request, e.g. kind="backtest" and key="<id>|<start>|<end>"."""
+    return os.path.join(CACHE_DIR, kind, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+def dump_json(data):
+    """Serializes data to JSON bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+def read_cache(kind, key, max_age_seconds):
+    """Returns the cached response for (kind, key), or None if it is missing or too old."""
+    if not USE_CACHE:
+        return None
+    path = cache_path(kind, key)
+    try:
+        if time.time() - os.path.getmtime(path) > max_age_seconds:
+            return None
+        with open(path, "rb") as f:
+            return parse_json(f.read())
+    except (OSError, ValueError):
+        return None
+
+def write_cache(kind, key, data, log=print):
+    """
+    Saves a response to the cache. The file is written under a temporary name
+    and then renamed into place, so a concurrent reader never sees half of it.
+    """
+    if not USE_CACHE:
+        return
+    path = cache_path(kind, key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(dump_json(data))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    except OSError as e:
+        log(f"--> Warning: Could not write {kind} cache file: {e}")
+
+
+def trim_backtest_response(data, symphony_id):
+    """
+    Keeps only the symphony's own capital series (dvm_capital[symphony_id]), the
+    one part of a backtest response the scripts use. The rest of the payload,
+    such as benchmark series, is dropped right after parsing so it is neither
+    kept in memory nor written to the cache.
+    """
+    dvm_capital = data.get('dvm_capital', {})
+    if symphony_id not in dvm_capital:
+        return {'dvm_capital': {}}
+    return {'dvm_capital': {symphony_id: dvm_capital[symphony_id]}}
+
+def fetch_backtest_data(symphony_id, start_date, base_payload, log=print):
+    """
+    Fetches historical backtest data for a single symphony. base_payload holds
+    the request fields shared by every symphony in the run (see run_main_logic).
+    Progress messages go to log, so a caller running this on a worker thread
+    can collect them and print them under the right symphony.
+    """
+    cache_key = f"{symphony_id}|{start_date}|{base_payload['end_date']}"
+    cached = read_cache("backtest", cache_key, BACKTEST_CACHE_SECONDS)
+    if cached is not None:
+        log(f"-> Using cached backtest data for {symphony_id}.")
+        return cached
+
+    url = f"{BACKTEST_API_BASE}/public/symphonies/{symphony_id}/backtest"
+    log(f"Fetching Backtest Data from: {url}")
+    
+    try:
+        response = SESSION.post(url, json={**base_payload, "start_date": start_date}, timeout=30)
+        response.raise_for_status()
+        data = trim_backtest_response(parse_json(response.content), symphony_id)
+    # ValueError covers a body that is not valid JSON (json/orjson decode errors)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        log(f"--> ERROR fetching backtest data for {symphony_id}: {e}")
+        return None
+    log(f"-> Successfully fetched backtest data for {symphony_id}.")
+    # A response without this symphony's series is not cached, so the next
+    # run asks the API again instead of reusing the gap for the whole day.
+    if symphony_id in data['dvm_capital']:
+        write_cache("backtest", cache_key, data, log)
+    return data
+
+def fetch_live_data(account_id, symphony_id, log=print):
+    """Fetches live portfolio history for a single symphony. Messages go to log."""
+    cache_key = f"{account_id}|{symphony_id}"
+    cached = read_cache("live", cache_key, LIVE_CACHE_SECONDS)
+    if cached is not None:
+        log(f"-> Using cached live portfolio data for {symphony_id}.")
+        return cached
+
+    url = f"{LIVE_API_BASE}/portfolio/accounts/{account_id}/symphonies/{symphony_id}"
+    log(f"Fetching Live Data from: {url}")
+    try:
+        response = SESSION.get(url, timeout=30)
+        response.raise_for_status()
+        data = parse_json(response.content)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        log(f"--> ERROR fetching live data for {symphony_id}: {e}")
+        return None
+    log(f"-> Successfully fetched live portfolio data for {symphony_id}.")
+    write_cache("live", cache_key, data, log)
+    return data
+
+def union_of_sorted_dates(dates_a, dates_b):
+    """
+    Returns the sorted, de-duplicated union of two already sorted date arrays.
+    A stable sort recognises the two pre-sorted runs and simply merges them, so
+    this is a single linear walk rather than the full re-sort np.union1d does.
+    """
+    if np.array_equal(dates_a, dates_b):
+        return dates_a
+    all_dates = np.concatenate((dates_a, dates_b))
+    all_dates.sort(kind='stable')
+    keep = np.ones(all_dates.size, dtype=bool)
+    keep[1:] = all_dates[1:] != all_dates[:-1]
+    return all_dates[keep]
+
+def align_to_dates(all_dates, dates, values):
+    """Spreads values onto the sorted all_dates axis, leaving NaN where a date is missing."""
+    column = np.full(all_dates.size, np.nan)
+    column[np.searchsorted(all_dates, dates)] = values
+    return column
+
+def to_performance_series(dates, values):
+    """
+    Turns date-sorted values into (dates, percentage change since the first value)
+    arrays in one vectorized step. If a date appears more than once, its last value wins.
+    """
+    if values.size and values[0] > 0:
+        pcts = values / values[0] - 1
+    else:
+        pcts = np.full(values.size, np.nan)
+    last_of_day = np.ones(dates.size, dtype=bool)
+    last_of_day[:-1] = dates[1:] != dates[:-1]
+    return dates[last_of_day], pcts[last_of_day]
+
+def nan_to_none(column):
+    """Returns the column as a list of Python floats, with None wherever it holds NaN."""
+    values = column.astype(object)
+    values[np.isnan(column)] = None
+    return values.tolist()
+
+def process_and_merge_data(live_data, backtest_data, symphony_id, start_date_filter):
+    """
+    Processes and merges data, using the logic from the user-provided data_tester.py.
+    Each source becomes its own date series, and the two are then aligned on the
+    union of their dates with NumPy instead of being merged date by date.
+    """
+    live_dates = backtest_dates = np.array([], dtype='datetime64[D]')
+    live_pcts = backtest_pcts = np.array([], dtype=np.float64)
+    # Both series are filtered by comparing datetime64 arrays against this
+    # cutoff, so no dates have to be formatted as strings until the output.
+    cutoff = np.datetime64(datetime.strptime(start_date_filter, '%Y-%m-%d').date(), 'D')
+
+    # 1. Process Live Data
+    if live_data and 'epoch_ms' in live_data and 'deposit_adjusted_series' in live_data:
+        # Sort by timestamp (ties by value, as sorting the (ms, value) pairs did)
+        # with an index sort over the two arrays instead of building a tuple per point.
+        point_count = min(len(live_data['epoch_ms']), len(live_data['deposit_adjusted_series']))
+        epoch_ms = np.asarray(live_data['epoch_ms'][:point_count], dtype=np.int64)
+        live_values = np.asarray(live_data['deposit_adjusted_series'][:point_count], dtype=np.float64)
+        order = np.lexsort((live_values, epoch_ms))
+        epoch_ms = epoch_ms[order]
+        live_values = live_values[order]
+        # Convert all timestamps to UTC calendar dates in one vectorized pass
+        # (datetime64 carries no timezone, so there is no local-time conversion).
+        live_days = epoch_ms.astype('datetime64[ms]').astype('datetime64[D]')
+        in_range = live_days >= cutoff
+        live_dates, live_pcts = to_performance_series(live_days[in_range], live_values[in_range])
+
+    # 2. Process Backtest Data
+    if backtest_data and 'dvm_capital' in backtest_data and symphony_id in backtest_data['dvm_capital']:
+        timeseries = backtest_data['dvm_capital'][symphony_id]
+        # Keys are day counts since 1970-01-01, so as datetime64[D] they already
+        # are the dates; no per-day timedelta/strftime is needed.
+        days = np.fromiter(map(int, timeseries.keys()), dtype=np.int64, count=len(timeseries))
+        values = np.fromiter(timeseries.values(), dtype=np.float64, count=len(timeseries))
+        order = np.argsort(days, kind='stable')
+        backtest_days = days[order].astype('datetime64[D]')
+        backtest_values = values[order]
+        in_range = backtest_days >= cutoff
+        backtest_dates, backtest_pcts = to_performance_series(backtest_days[in_range], backtest_values[in_range])
+    
+    # 3. Align both series on the union of their dates (missing values become NaN)
+    all_dates = union_of_sorted_dates(live_dates, backtest_dates)
+    live_column = align_to_dates(all_dates, live_dates, live_pcts)
+    backtest_column = align_to_dates(all_dates, backtest_dates, backtest_pcts)
+
+    # 4. Convert the aligned columns to a list of rows for final output
+    final_data = [
+        {"Date": date_str, "Live": live, "Backtest": backtest}
+        for date_str, live, backtest in zip(
+            all_dates.astype(str).tolist(), nan_to_none(live_column), nan_to_none(backtest_column)
+        )
+    ]
+        
+    return final_data
+
+def run_main_logic(symphonies, secret_key, account_id, api_key, start_date):
+    """
+    Main logic to fetch, process, and print data for a group of symphonies.
+    symphonies maps each symphony's display name to its Composer ID.
+    """
+    set_auth_headers(api_key, secret_key)
+    # Everything in the backtest request except the start date is the same for
+    # every symphony, so it is built once per run rather than once per call.
+    base_payload = {**BACKTEST_PAYLOAD, "end_date": date.today().isoformat()}
+    all_rows = []
+
+    # The requests are independent and I/O-bound, so issue them all up front
+    # and let them run side by side instead of one symphony at a time.
+    # Backtests are queued first: they take far longer to compute server-side
+    # than the live lookups, so starting them early shortens the whole run.
+    # A symphony listed under more than one name is only fetched once.
+    unique_ids = list(dict.fromkeys(symphonies.values()))
+    # Worker threads printing directly would interleave their output, so each
+    # fetch logs into its own list and the loop below prints those messages
+    # under the symphony they belong to.
+    live_logs = {symphony_id: [] for symphony_id in unique_ids}
+    backtest_logs = {symphony_id: [] for symphony_id in unique_ids}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        backtest_futures = {
+            symphony_id: executor.submit(fetch_backtest_data, symphony_id, start_date, base_payload,
+                                         backtest_logs[symphony_id].append)
+            for symphony_id in unique_ids
+        }
+        live_futures = {
+            symphony_id: executor.submit(fetch_live_data, account_id, symphony_id,
+                                         live_logs[symphony_id].append)
+            for symphony_id in unique_ids
+        }
+    
+    # Symphonies are processed in name order, and each one's rows come back in
+    # date order, so all_rows is built already sorted for the output below.
+    for symphony_name, symphony_id in sorted(symphonies.items()):
+        print(f"\n{'='*20} Processing: {symphony_name} ({symphony_id}) {'='*20}")
+        
+        live_data = live_futures[symphony_id].result()
+        backtest_data = backtest_futures[symphony_id].result()
+        # pop: a symphony listed twice shows its fetch messages only once.
+        for message in live_logs.pop(symphony_id, []) + backtest_logs.pop(symphony_id, []):
+            print(message)
+        
+        if live_data or backtest_data:
+            processed_data = process_and_merge_data(live_data, backtest_data, symphony_id, start_date)
+            for row_data in processed_data:
+                row_data["Symphony"] = symphony_name
+                all_rows.append(row_data)
+        else:
+            print(f"--> Could not fetch any data for {symphony_name}. Skipping.")
+
+    if all_rows:
+        print("\n\n--- Copy the data below and paste it into Google Sheets ---")
+        # Build the whole CSV first and write it in one go rather than one print per row.
+        lines = ["Date,Symphony Name,Live Performance (%),Backtest Performance (%)"]
+        for row in all_rows:
+            live_str = f"{row['Live']:.4f}" if row['Live'] is not None else ''
+            backtest_str = f"{row['Backtest']:.4f}" if row['Backtest'] is not None else ''
+            lines.append(f"{row['Date']},{row['Symphony']},{live_str},{backtest_str}")
+        sys.stdout.write("\n".join(lines) + "\n")
+    else:
+        print("\nNo data was processed for any symphony.")
+
@@ -1,9 +1,7 @@
-import subprocess
-import sys
 import os
 from datetime import datetime
-import time
-from auth import get_auth_details # <-- Import the new authentication function
+import traceback
+from composer_lib import get_auth_details, load_script_module, run_main_logic # <-- Authentication is remembered for the whole run
 
 # --- Configuration ---
 # Add the filenames of all your symphony scripts that you want to run
@@ -24,6 +22,8 @@ def run_monthly_scripts(api_key, secret_key, account_id, start_date):
     """
     Loops through the list of script files and runs each one,
     passing the provided credentials and start date as arguments.
+    The scripts are imported and run in this process rather than started as
+    separate Python processes, so they all share one HTTP session and cache.
     """
     print(f"\nFound {len(MONTHLY_SCRIPT_FILES)} scripts to run.")
     
@@ -35,26 +35,13 @@ def run_monthly_scripts(api_key, secret_key, account_id, start_date):
         print(f"\n{'='*20} Running: {script_file} for start date {start_date} {'='*20}")
         
         try:
-            # Pass all three credentials plus the start date to the child script.
-            result = subprocess.run(
-                [sys.executable, script_file, secret_key, account_id, api_key, start_date],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            print(result.stdout)
+            script = load_script_module(script_file)
+            # Pass all three credentials plus the start date along with the script's symphonies.
+            run_main_logic(script.SYMPHONIES, secret_key, account_id, api_key, start_date)
             
-        except subprocess.CalledProcessError as e:
+        except Exception:
             print(f"--- ERROR running {script_file} ---")
-            print("--- Script Output (stdout): ---")
-            print(e.stdout)
-            print("--- Script Error (stderr): ---")
-            print(e.stderr)
-        except FileNotFoundError:
-             print(f"ERROR: Could not find the Python interpreter at '{sys.executable}'")
-             break
-        
-        time.sleep(1)
+            traceback.print_exc()
 
 
 if __name__ == "__main__":
@@ -1,22 +1,26 @@
 import numpy as np
-import requests
 import os
 import sys
 from datetime import datetime, date, timedelta
-import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Step 1: Import Authentication and Utility Functions ---
+# The login itself goes through composer_lib.get_auth_details (imported below),
+# which remembers the credentials; auth.py is only checked for up front here.
 try:
-    from auth import get_auth_details
+    import auth
 except ImportError:
     print("Error: Could not find 'auth.py'.")
     print("Please ensure it is in the same directory.")
     sys.exit(1)
 
 # --- Configuration ---
-# API endpoints from your scripts
-BACKTEST_API_BASE = "https://backtest-api.composer.trade/api/v2"
-LIVE_API_BASE = "https://stagehand-api.composer.trade/api/v1"
+# The API endpoints, the pooled HTTP session (with its retry policy) and the
+# on-disk response cache are shared with the symphony group scripts.
+from composer_lib import (
+    BACKTEST_PAYLOAD, MAX_WORKERS, get_auth_details, set_auth_headers,
+    load_script_module, fetch_backtest_data, fetch_live_data,
+)
 
 # --- Step 2: Discover Symphonies and their Start Dates from Master Runner ---
 def get_symphony_list_from_scripts():
@@ -26,11 +30,10 @@ def get_symphony_list_from_scripts():
     from each file.
     """
     symphonies = {}
+    seen_ids = set() # IDs already in symphonies, for O(1) duplicate checks
     try:
         # Dynamically import the list of scripts from master_runner.py
-        spec = importlib.util.spec_from_file_location("master_runner", "master_runner.py")
-        master_runner = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(master_runner)
+        master_runner = load_script_module("master_runner.py")
         symphony_script_files = master_runner.SYMPHONY_SCRIPT_FILES
         
         print(f"Found {len(symphony_script_files)} script files listed in master_runner.py.")
@@ -41,15 +44,14 @@ def get_symphony_list_from_scripts():
                 continue
             
             # Dynamically import the SYMPHONIES dictionary and START_DATE from each script
-            spec = importlib.util.spec_from_file_location(script_file, script_file)
-            symph_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(symph_module)
+            symph_module = load_script_module(script_file)
             
             start_date_for_script = symph_module.START_DATE
             
             for name, sym_id in symph_module.SYMPHONIES.items():
-                if sym_id not in [s['id'] for s in symphonies.values()]:
+                if sym_id not in seen_ids:
                      symphonies[name] = {'id': sym_id, 'start_date': start_date_for_script}
+                     seen_ids.add(sym_id)
 
     except (ImportError, AttributeError, FileNotFoundError) as e:
         print(f"Error reading symphony configurations: {e}")
@@ -61,72 +63,61 @@ def get_symphony_list_from_scripts():
 
 
 # --- Step 3: Real Data Pulling Functions ---
-def get_backtest_pnl_series(api_key, secret_key, symphony_id, start_date):
+def get_backtest_pnl_series(symphony_id, start_date, base_payload, log=print):
     """
     Pulls backtest data using the full, detailed payload that is confirmed
-    to work for all symphonies.
+    to work for all symphonies. base_payload is built once in main() and
+    only needs the symphony's start date added. Messages go to log, so main()
+    can print them under the symphony's header.
     """
-    url = f"{BACKTEST_API_BASE}/public/symphonies/{symphony_id}/backtest"
-    headers = {
-        "Authorization": f"Bearer {secret_key}",
-        "x-api-key-id": api_key,
-        "x-origin": "public-api"
-    }
-    
-    # Use the full payload directly as it's been confirmed to work universally.
-    full_payload = {
-        "capital": 10000, "start_date": start_date, "end_date": date.today().isoformat(),
-        "broker": "apex", "slippage_percent": 0.0005, "backtest_version": "v2",
-        "apply_reg_fee": True, "apply_taf_fee": True
-    }
-    
-    print(f"  Fetching backtest from {start_date}...")
-    try:
-        response = requests.post(url, headers=headers, json=full_payload, timeout=30)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        print(f"  --> ERROR fetching backtest data: {e}")
+    # The request and the on-disk cache are composer_lib's, so a backtest
+    # already downloaded by a master runner today is reused here.
+    data = fetch_backtest_data(symphony_id, start_date, base_payload, lambda m: log("  " + m))
+    if data is None:
         return None
 
     # Process the successful response
-    data = response.json()
     if symphony_id in data.get('dvm_capital', {}):
         symphony_timeseries = data['dvm_capital'][symphony_id]
-        capital_values = list(symphony_timeseries.values())
-        pnl_series = np.diff(capital_values)
+        # Read the values straight into one float64 buffer (no intermediate list)
+        # and write the day-to-day differences into a preallocated array.
+        count = len(symphony_timeseries)
+        capital_values = np.fromiter(symphony_timeseries.values(), dtype=np.float64, count=count)
+        pnl_series = np.empty(max(count - 1, 0), dtype=np.float64)
+        np.subtract(capital_values[1:], capital_values[:-1], out=pnl_series)
         if len(pnl_series) > 0:
-            print(f"  -> Successfully processed backtest data for {symphony_id}.")
+            log(f"  -> Successfully processed backtest data for {symphony_id}.")
             return pnl_series
         else:
-            print(f"  --> Warning: Backtest for {symphony_id} had values but no P&L changes.")
+            log(f"  --> Warning: Backtest for {symphony_id} had values but no P&L changes.")
             return []
     else:
-        print(f"  --> ERROR: Symphony ID {symphony_id} not found in backtest response.")
+        log(f"  --> ERROR: Symphony ID {symphony_id} not found in backtest response.")
         return []
 
-def get_live_pnl(api_key, secret_key, account_id, symphony_id):
-    """Pulls the most recent live P&L data for a given symphony."""
-    url = f"{LIVE_API_BASE}/portfolio/accounts/{account_id}/symphonies/{symphony_id}"
-    headers = {
-        "Authorization": f"Bearer {secret_key}",
-        "x-api-key-id": api_key,
-        "x-origin": "public-api"
-    }
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+def get_live_pnl(account_id, symphony_id, log=print):
+    """Pulls the most recent live P&L data for a given symphony. Messages go to log."""
+    data = fetch_live_data(account_id, symphony_id, lambda m: log("  " + m))
+    if data is None:
+        return None
         
-        if 'deposit_adjusted_series' in data and len(data['deposit_adjusted_series']) >= 2:
-            live_points = sorted(data['deposit_adjusted_series'])
-            last_pnl = live_points[-1] - live_points[-2]
-            print(f"  -> Successfully fetched live P&L for {symphony_id}.")
-            return last_pnl
+    series = data.get('deposit_adjusted_series', [])
+    if len(series) >= 2:
+        epoch_ms = data.get('epoch_ms')
+        if epoch_ms is not None and len(epoch_ms) == len(series):
+            # The two most recent points by timestamp. (Sorting the values
+            # themselves, as this used to, ranks them by size, not by time.)
+            # argpartition finds the two latest in O(N) without a full sort.
+            latest_two = np.argpartition(np.asarray(epoch_ms, dtype=np.int64), -2)[-2:]
+            previous, latest = sorted(latest_two.tolist(), key=lambda i: epoch_ms[i])
         else:
-            print(f"  --> Warning: Not enough live data points for {symphony_id} to calculate P&L.")
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"  --> ERROR fetching live data for {symphony_id}: {e}")
+            # No usable timestamps: rely on the API returning the series in time order.
+            previous, latest = len(series) - 2, len(series) - 1
+        last_pnl = series[latest] - series[previous]
+        log(f"  -> Successfully fetched live P&L for {symphony_id}.")
+        return last_pnl
+    else:
+        log(f"  --> Warning: Not enough live data points for {symphony_id} to calculate P&L.")
         return None
 
 # --- Step 4: Z-Score Calculation Logic ---
@@ -145,27 +136,54 @@ def main():
     if not all([api_key, secret_key, account_id]):
         print("\nAuthentication failed. Cannot proceed.")
         return
+    set_auth_headers(api_key, secret_key)
 
     symphonies_to_run = get_symphony_list_from_scripts()
     if not symphonies_to_run:
         print("No symphonies found to analyze. Exiting.")
         return
 
+    # The shared backtest settings plus today's date, computed once for the run.
+    base_payload = {**BACKTEST_PAYLOAD, "end_date": date.today().isoformat()}
+
+    # Fetch everything concurrently up front; the API calls are independent
+    # and I/O-bound. The slow backtests are queued ahead of the live lookups.
+    # Workers log into per-symphony lists instead of printing, so their output
+    # doesn't interleave and is shown under each symphony's header below.
+    backtest_logs = {name: [] for name in symphonies_to_run}
+    live_logs = {name: [] for name in symphonies_to_run}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        backtest_futures = {
+            name: executor.submit(get_backtest_pnl_series, details['id'], details['start_date'], base_payload,
+                                  backtest_logs[name].append)
+            for name, details in symphonies_to_run.items()
+        }
+        live_futures = {
+            name: executor.submit(get_live_pnl, account_id, details['id'], live_logs[name].append)
+            for name, details in symphonies_to_run.items()
+        }
+
     results = []
     for name, details in symphonies_to_run.items():
         sym_id = details['id']
-        start_date = details['start_date']
         print(f"\n--- Processing: {name} ({sym_id}) ---")
 
-        backtest_pnl_series = get_backtest_pnl_series(api_key, secret_key, sym_id, start_date)
-        live_value = get_live_pnl(api_key, secret_key, account_id, sym_id)
+        backtest_pnl_series = backtest_futures[name].result()
+        live_value = live_futures[name].result()
+        for message in backtest_logs[name] + live_logs[name]:
+            print(message)
 
-        if backtest_pnl_series is None or live_value is None or len(backtest_pnl_series) < 2:
-            print(f"Warning: Not enough backtest data points (requires at least 2) for '{name}'. Skipping.")
+        if backtest_pnl_series is None or live_value is None or len(backtest_pnl_series) < 2:
+            print(f"Warning: Not enough backtest data points (requires at least 2) for '{name}'. Skipping.")
             continue
 
-        mean_pnl = np.mean(backtest_pnl_series)
-        std_dev_pnl = np.std(backtest_pnl_series, ddof=1) # Use sample standard deviation
+        # One summing pass for the mean and one dot product for the squared
+        # deviations, rather than separate np.mean/np.std traversals (np.std
+        # alone recomputes the mean and allocates a squared-deviation array).
+        n = len(backtest_pnl_series)
+        mean_pnl = backtest_pnl_series.sum() / n
+        deviations = backtest_pnl_series - mean_pnl
+        std_dev_pnl = np.sqrt(deviations.dot(deviations) / (n - 1)) # Use sample standard deviation
         z_score = calculate_z_score(live_value, mean_pnl, std_dev_pnl)
         
         results.append({
@@ -183,8 +201,11 @@ def main():
         
         print("\n\n--- Analysis Complete: Deviation Ranking ---")
         print("(Ranked from most to least deviant from historical performance)\n")
-        for i, res in enumerate(most_deviant_symphs):
-            print(f"{i+1}. {res['name']} (Z-Score: {res['z_score']:.2f})")
+        ranking = [
+            f"{i+1}. {res['name']} (Z-Score: {res['z_score']:.2f})"
+            for i, res in enumerate(most_deviant_symphs)
+        ]
+        sys.stdout.write("\n".join(ranking) + "\n")
 
 if __name__ == "__main__":
     main()